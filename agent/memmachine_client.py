@@ -3,9 +3,63 @@ from __future__ import annotations
 
 import json
 import os
-from typing import Any, Dict, List, Optional
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
 
-import requests
+import anyio.to_thread
+import httpx
+
+try:
+    import orjson  # C-level JSON, ~10x faster than stdlib
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+try:
+    import ijson  # streaming parser; auto-selects the yajl2_c backend
+except ImportError:  # pragma: no cover - optional dependency
+    ijson = None
+
+try:
+    import msgpack  # compact binary format, several times faster than JSON
+except ImportError:  # pragma: no cover - optional dependency
+    msgpack = None
+
+# Above this size the one-time load of the fallback store streams the users
+# map with ijson instead of buffering raw text + full parse tree at once.
+_STREAM_THRESHOLD_BYTES = 1_000_000
+
+
+def _canonical(constraint_dict: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Coerces a constraint dict to the canonical shape consumed by the
+    orchestrator: {id, type, severity, params, text}. Normalizing here, at
+    write/fetch time, means the per-request path uses items as-is.
+    """
+    cid = (
+        constraint_dict.get("constraint_id")
+        or constraint_dict.get("id")
+        or constraint_dict.get("constraintId")
+    )
+    return {
+        "id": cid,
+        "type": constraint_dict.get("type"),
+        "severity": constraint_dict.get("severity", "HARD"),
+        "params": constraint_dict.get("params", {}) or {},
+        "text": constraint_dict.get("text", ""),
+    }
+
+
+def _json_loads(raw: str) -> Any:
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+def _json_dumps_indent(data: Any) -> str:
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2).decode()
+    return json.dumps(data, ensure_ascii=False, indent=2)
 
 
 class MemMachineClient:
@@ -21,8 +75,47 @@ class MemMachineClient:
         self.api_key = api_key or ""
         self.namespace = namespace or "memory_firewall_demo"
 
-        # Fallback local store (persist across restarts)
+        # Persistent async client: keep-alive + pooling avoids a fresh
+        # TCP/TLS handshake per call, and HTTP/2 multiplexes concurrent
+        # calls over one connection.
+        # http2/limits must be configured on the transport: httpx ignores the
+        # client-level kwargs when an explicit transport is supplied.
+        self._client = httpx.AsyncClient(
+            base_url=self.endpoint or "http://localhost",
+            headers={
+                "Authorization": f"Bearer {self.api_key}",
+                "Content-Type": "application/json",
+            },
+            timeout=15.0,
+            transport=httpx.AsyncHTTPTransport(
+                retries=3,
+                http2=True,
+                limits=httpx.Limits(max_keepalive_connections=20),
+            ),
+        )
+
+        # Fallback local store (persist across restarts). Parsed once here;
+        # reads serve from memory and writes re-serialize + os.replace().
+        # New writes go to a msgpack sidecar when available (the store is
+        # local-only, so portability doesn't matter); the JSON file remains
+        # as a one-time migration source and as the format when msgpack is
+        # missing or MEMMACHINE_FALLBACK_JSON=1 asks for a debuggable store.
         self._local_path = os.path.join(os.getcwd(), f".memmachine_fallback_{self.namespace}.json")
+        self._local_bin = f"{self._local_path}.msgpack"
+        self._local_lock = threading.Lock()
+        self._data: Dict[str, Any] = self._read_local()
+
+        # Per-user cache of list_constraints() results. Constraints only
+        # change through store_constraint(), which invalidates the entry, so
+        # /request never has to re-fetch/re-parse an unchanged list. In
+        # remote mode entries expire after a TTL so writes from other
+        # processes eventually become visible.
+        self._cache: Dict[str, Tuple[float, List[Dict[str, Any]]]] = {}
+        self._cache_lock = threading.Lock()
+        self._cache_ttl = 30.0  # seconds; only enforced in remote mode
+
+    async def close(self) -> None:
+        await self._client.aclose()
 
     def _enabled(self) -> bool:
         return bool(self.endpoint and self.api_key)
@@ -30,83 +123,139 @@ class MemMachineClient:
     # -----------------------
     # Public API expected by app.py
     # -----------------------
-    def store_constraint(self, user_id: str, constraint_dict: Dict[str, Any]) -> None:
+    async def store_constraint(self, user_id: str, constraint_dict: Dict[str, Any]) -> None:
         """
-        Stores a constraint as a durable memory item.
+        Stores a constraint as a durable memory item (in canonical shape).
         """
+        constraint_dict = _canonical(constraint_dict)
         if self._enabled():
-            self._store_remote(user_id, constraint_dict)
+            await self._store_remote(user_id, constraint_dict)
         else:
-            self._store_local(user_id, constraint_dict)
+            # Blocking serialization + disk write; keep it off the event loop.
+            await anyio.to_thread.run_sync(self._store_local, user_id, constraint_dict)
+        with self._cache_lock:
+            self._cache.pop(user_id, None)
 
-    def list_constraints(self, user_id: str) -> List[Dict[str, Any]]:
+    async def list_constraints(self, user_id: str) -> List[Dict[str, Any]]:
         """
-        Returns all stored constraint items for the user.
+        Returns all stored constraint items for the user, in canonical shape.
         """
+        now = time.monotonic()
+        with self._cache_lock:
+            entry = self._cache.get(user_id)
+            if entry is not None:
+                fetched_at, items = entry
+                if not self._enabled() or now - fetched_at < self._cache_ttl:
+                    return items
+
         if self._enabled():
-            return self._list_remote(user_id)
-        return self._list_local(user_id)
+            items = await self._list_remote(user_id)
+        else:
+            # _list_local contends on the store lock with writers; off-loop too.
+            items = await anyio.to_thread.run_sync(self._list_local, user_id)
+        # Re-coerce on fetch so items stored before normalization (or by a
+        # remote writer with different key names) come out canonical too.
+        items = [_canonical(c) for c in items]
+        with self._cache_lock:
+            self._cache[user_id] = (now, items)
+        return items
 
     # -----------------------
     # Fallback local store
     # -----------------------
+    def _use_msgpack(self) -> bool:
+        return msgpack is not None and os.getenv("MEMMACHINE_FALLBACK_JSON", "") != "1"
+
     def _read_local(self) -> Dict[str, Any]:
+        # Reads follow the same format choice as writes so a store written
+        # in one mode can't be shadowed by a stale file in the other; the
+        # non-active format is only consulted as a migration source when the
+        # active file is missing (writes delete the superseded copy).
+        if self._use_msgpack() and os.path.exists(self._local_bin):
+            with open(self._local_bin, "rb") as f:
+                return msgpack.unpackb(f.read(), raw=False)
         if not os.path.exists(self._local_path):
+            if msgpack is not None and os.path.exists(self._local_bin):
+                with open(self._local_bin, "rb") as f:
+                    return msgpack.unpackb(f.read(), raw=False)
             return {"namespace": self.namespace, "users": {}}
+        # Large stores are streamed one user at a time rather than holding
+        # the raw text and the full parse tree in memory simultaneously.
+        if ijson is not None and os.path.getsize(self._local_path) > _STREAM_THRESHOLD_BYTES:
+            users: Dict[str, Any] = {}
+            with open(self._local_path, "rb") as f:
+                # use_float: ijson defaults to decimal.Decimal for numbers,
+                # which orjson/msgpack refuse to serialize on the next write.
+                for user_id, items in ijson.kvitems(f, "users", use_float=True):
+                    users[user_id] = items
+            return {"namespace": self.namespace, "users": users}
         with open(self._local_path, "r", encoding="utf-8") as f:
-            return json.load(f)
+            return _json_loads(f.read())
 
     def _write_local(self, data: Dict[str, Any]) -> None:
-        with open(self._local_path, "w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        # Write to a sibling tmp file then os.replace() so readers never see
+        # a partially written store.
+        if self._use_msgpack():
+            tmp_path = f"{self._local_bin}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(msgpack.packb(data, use_bin_type=True))
+            os.replace(tmp_path, self._local_bin)
+            self._remove_superseded(self._local_path)
+            return
+        tmp_path = f"{self._local_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(_json_dumps_indent(data))
+        os.replace(tmp_path, self._local_path)
+        self._remove_superseded(self._local_bin)
+
+    @staticmethod
+    def _remove_superseded(path: str) -> None:
+        # The other-format copy is stale once a write lands; drop it so a
+        # later format switch can't resurrect old data.
+        try:
+            os.remove(path)
+        except OSError:
+            pass
 
     def _store_local(self, user_id: str, constraint_dict: Dict[str, Any]) -> None:
-        data = self._read_local()
-        users = data.setdefault("users", {})
-        items = users.setdefault(user_id, [])
+        with self._local_lock:
+            users = self._data.setdefault("users", {})
+            items = users.setdefault(user_id, [])
 
-        # Upsert by id
-        cid = constraint_dict.get("id")
-        items = [x for x in items if x.get("id") != cid]
-        items.append(constraint_dict)
-        users[user_id] = items
-        self._write_local(data)
+            # Upsert by id
+            cid = constraint_dict.get("id")
+            items = [x for x in items if x.get("id") != cid]
+            items.append(constraint_dict)
+            users[user_id] = items
+            self._write_local(self._data)
 
     def _list_local(self, user_id: str) -> List[Dict[str, Any]]:
-        data = self._read_local()
-        return data.get("users", {}).get(user_id, [])
+        with self._local_lock:
+            return self._data.get("users", {}).get(user_id, [])
 
     # -----------------------
     # Remote MemMachine (adjust endpoints to actual MemMachine docs)
     # -----------------------
-    def _headers(self) -> Dict[str, str]:
-        return {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json",
-        }
-
-    def _store_remote(self, user_id: str, constraint_dict: Dict[str, Any]) -> None:
+    async def _store_remote(self, user_id: str, constraint_dict: Dict[str, Any]) -> None:
         """
         TODO: Replace URL/path with MemMachine's actual API.
         """
-        url = f"{self.endpoint}/memories"
         payload = {
             "namespace": self.namespace,
             "user_id": user_id,
             "type": "policy_constraint",
             "content": constraint_dict,
         }
-        r = requests.post(url, headers=self._headers(), json=payload, timeout=15)
+        r = await self._client.post("/memories", json=payload)
         if r.status_code >= 300:
             raise RuntimeError(f"MemMachine store failed ({r.status_code}): {r.text}")
 
-    def _list_remote(self, user_id: str) -> List[Dict[str, Any]]:
+    async def _list_remote(self, user_id: str) -> List[Dict[str, Any]]:
         """
         TODO: Replace URL/path with MemMachine's actual API.
         """
-        url = f"{self.endpoint}/memories"
         params = {"namespace": self.namespace, "user_id": user_id, "type": "policy_constraint"}
-        r = requests.get(url, headers=self._headers(), params=params, timeout=15)
+        r = await self._client.get("/memories", params=params)
         if r.status_code >= 300:
             raise RuntimeError(f"MemMachine list failed ({r.status_code}): {r.text}")
 
@@ -3,15 +3,16 @@ from __future__ import annotations
 
 import re
 from dataclasses import dataclass
-from datetime import datetime
+from datetime import datetime, timezone
+from secrets import token_hex
 from typing import Any, Dict, List, Optional, Tuple
-from uuid import uuid4
 
 from agent.neo4j_client import Neo4jClient, ActionPayload
 from agent.policy import (
     BUDGET_CAP,
     NO_MEETINGS_AFTER_HOUR,
     NO_SHARING_WITH_EXTERNALS,
+    compile_keyword_scanner,
 )
 
 # Action types
@@ -20,6 +21,28 @@ SHARE_DATA = "SHARE_DATA"
 SPEND_MONEY = "SPEND_MONEY"
 UNKNOWN = "UNKNOWN"
 
+# Compiled once at import; these run on every /request.
+_WS_RE = re.compile(r"\s+")
+# One alternation covers both time shapes (10:30pm / 10pm vs 21:00) so the
+# text is scanned once; the matched group tells us which branch fired. An
+# am/pm match anywhere wins over an earlier bare 21:00 match, matching the
+# original two-pass order.
+_TIME_RE = re.compile(
+    r"\b(?:(?P<h1>\d{1,2})(?::\d{2})?\s*(?P<ampm>a\.?m\.?|p\.?m\.?)|(?P<h2>\d{1,2}):\d{2})\b"
+)
+_AMOUNT_RE = re.compile(r"\$\s*([0-9][0-9,]*(?:\.[0-9]+)?)")
+
+# Single-pass keyword scan for action classification.
+_ACTION_SCAN = compile_keyword_scanner(
+    {
+        "meeting": ("meeting", "call", "schedule", "book", "invite"),
+        "share": ("share", "send", "export", "forward", "upload"),
+        "data": ("dataset", "data", "file", "files", "csv"),
+        "money": ("buy", "purchase", "spend", "pay", "order"),
+        "external": ("contractor", "external", "third party", "3rd party", "vendor"),
+    }
+)
+
 
 @dataclass
 class Decision:
@@ -32,21 +55,20 @@ class Decision:
 
 
 def _norm(s: str) -> str:
-    return re.sub(r"\s+", " ", (s or "").strip().lower())
+    return _WS_RE.sub(" ", (s or "").strip().lower())
 
 
 def classify_action(user_request: str) -> str:
     t = _norm(user_request)
+    cats = _ACTION_SCAN(t)
 
-    if any(w in t for w in ["meeting", "call", "schedule", "book", "invite"]):
+    if "meeting" in cats:
         return SCHEDULE_MEETING
 
-    if any(w in t for w in ["share", "send", "export", "forward", "upload"]) and any(
-        w in t for w in ["dataset", "data", "file", "files", "csv"]
-    ):
+    if "share" in cats and "data" in cats:
         return SHARE_DATA
 
-    if any(w in t for w in ["buy", "purchase", "spend", "pay", "order"]) or "$" in t:
+    if "money" in cats or "$" in t:
         return SPEND_MONEY
 
     return UNKNOWN
@@ -59,39 +81,37 @@ def _parse_time_to_hour(text: str) -> Optional[int]:
     """
     t = _norm(text)
 
-    # 10:30pm / 10pm
-    m = re.search(r"\b(\d{1,2})(?::(\d{2}))?\s*(a\.?m\.?|p\.?m\.?)\b", t)
-    if m:
-        h = int(m.group(1))
-        ampm = m.group(3).replace(".", "")
-        if ampm == "pm" and h != 12:
-            h += 12
-        if ampm == "am" and h == 12:
-            h = 0
-        if 0 <= h <= 23:
-            return h
-
-    # 21:00 or 21
-    m2 = re.search(r"\b(\d{1,2})(?::\d{2})\b", t)
-    if m2:
-        h = int(m2.group(1))
-        if 0 <= h <= 23:
-            return h
-
-    return None
+    h24: Optional[int] = None
+    for m in _TIME_RE.finditer(t):
+        if m.group("ampm"):
+            # 10:30pm / 10pm — preferred over any bare-24h match
+            h = int(m.group("h1"))
+            ampm = m.group("ampm").replace(".", "")
+            if ampm == "pm" and h != 12:
+                h += 12
+            if ampm == "am" and h == 12:
+                h = 0
+            if 0 <= h <= 23:
+                return h
+        elif h24 is None:
+            # 21:00 — kept as fallback in case an am/pm time follows
+            h = int(m.group("h2"))
+            if 0 <= h <= 23:
+                h24 = h
+
+    return h24
 
 
 def _parse_amount(text: str) -> Optional[float]:
     t = _norm(text)
-    m = re.search(r"\$\s*([0-9][0-9,]*(?:\.[0-9]+)?)", t)
+    m = _AMOUNT_RE.search(t)
     if m:
         return float(m.group(1).replace(",", ""))
     return None
 
 
 def _mentions_external_party(text: str) -> bool:
-    t = _norm(text)
-    return any(w in t for w in ["contractor", "external", "third party", "3rd party", "vendor"])
+    return "external" in _ACTION_SCAN(_norm(text))
 
 
 def _alternatives_for_meeting(max_hour: int) -> List[str]:
@@ -121,7 +141,7 @@ def _alternatives_for_budget(max_amount: float) -> List[str]:
     ]
 
 
-def evaluate_request(
+async def evaluate_request(
     *,
     user_id: str,
     user_request: str,
@@ -129,9 +149,9 @@ def evaluate_request(
     neo: Neo4jClient,
 ) -> Decision:
     """
-    constraints items should look like:
+    constraints items come from MemMachineClient in canonical shape:
       {
-        "constraint_id" or "id": "...",
+        "id": "...",
         "type": "...",
         "severity": "HARD",
         "params": {...},
@@ -139,88 +159,80 @@ def evaluate_request(
       }
     """
     action_type = classify_action(user_request)
-    action_id = f"a-{uuid4().hex[:10]}"
-
-    # Record action in graph
-    neo.record_action(
-        user_id,
-        ActionPayload(
-            id=action_id,
-            type=action_type,
-            text=user_request,
-            ts=datetime.utcnow().isoformat(timespec="seconds") + "Z",
-        ),
-    )
-
-    violations: List[Tuple[str, str]] = []  # (constraint_id, reason)
-    alternatives: List[str] = []
-
-    # Normalize constraints input keys
-    normalized_constraints: List[Dict[str, Any]] = []
-    for c in constraints:
-        cid = c.get("constraint_id") or c.get("id") or c.get("constraintId")
-        normalized_constraints.append(
-            {
-                "id": cid,
-                "type": c.get("type"),
-                "severity": c.get("severity", "HARD"),
-                "params": c.get("params", {}) or {},
-                "text": c.get("text", ""),
-            }
+    # token_hex(5) gives the same 10 hex chars as the old sliced uuid4 but
+    # without generating (and discarding most of) a full UUID.
+    action_id = f"a-{token_hex(5)}"
+
+    # One session for the whole request: record the action, batch-write any
+    # violations, and run the explainability query without re-opening a
+    # Bolt session per call.
+    async with neo.session() as session:
+        # Record action in graph
+        await neo.record_action(
+            user_id,
+            ActionPayload(
+                id=action_id,
+                type=action_type,
+                text=user_request,
+                ts=datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+            ),
+            session=session,
         )
 
-    # --- Check A: meeting time ---
-    if action_type == SCHEDULE_MEETING:
-        req_hour = _parse_time_to_hour(user_request)
-        # Find matching constraint
-        for c in normalized_constraints:
-            if c["type"] == NO_MEETINGS_AFTER_HOUR:
-                max_hour = int(c["params"].get("hour", 21))
-                if req_hour is not None and req_hour > max_hour:
-                    violations.append((c["id"], f"Requested meeting at {req_hour}:00 exceeds allowed end hour {max_hour}:00"))
-                    alternatives.extend(_alternatives_for_meeting(max_hour))
-
-    # --- Check B: external sharing ---
-    if action_type == SHARE_DATA:
-        if _mentions_external_party(user_request):
-            for c in normalized_constraints:
-                if c["type"] == NO_SHARING_WITH_EXTERNALS:
+        violations: List[Tuple[str, str]] = []  # (constraint_id, reason)
+        alternatives: List[str] = []
+
+        # Index constraints by type so each check below is a dict lookup
+        # instead of a scan over all constraints. Items are already in
+        # canonical shape (normalized at store/fetch time).
+        by_type: Dict[str, List[Dict[str, Any]]] = {}
+        for c in constraints:
+            by_type.setdefault(c["type"], []).append(c)
+
+        # --- Check A: meeting time ---
+        if action_type == SCHEDULE_MEETING and by_type.get(NO_MEETINGS_AFTER_HOUR):
+            req_hour = _parse_time_to_hour(user_request)
+            if req_hour is not None:
+                for c in by_type[NO_MEETINGS_AFTER_HOUR]:
+                    max_hour = int(c["params"].get("hour", 21))
+                    if req_hour > max_hour:
+                        violations.append((c["id"], f"Requested meeting at {req_hour}:00 exceeds allowed end hour {max_hour}:00"))
+                        alternatives.extend(_alternatives_for_meeting(max_hour))
+
+        # --- Check B: external sharing ---
+        if action_type == SHARE_DATA and by_type.get(NO_SHARING_WITH_EXTERNALS):
+            if _mentions_external_party(user_request):
+                for c in by_type[NO_SHARING_WITH_EXTERNALS]:
                     violations.append((c["id"], "Request involves external/contractor sharing, which is prohibited"))
                     alternatives.extend(_alternatives_for_sharing())
 
-    # --- Check C: budget cap ---
-    if action_type == SPEND_MONEY:
-        amt = _parse_amount(user_request)
-        for c in normalized_constraints:
-            if c["type"] == BUDGET_CAP:
-                cap = float(c["params"].get("max_amount", 0))
-                if amt is not None and cap > 0 and amt > cap:
-                    violations.append((c["id"], f"Requested spend ${amt:.2f} exceeds budget cap ${cap:.2f}"))
-                    alternatives.extend(_alternatives_for_budget(cap))
-
-    # If violations found, materialize in graph and return explainability
-    if violations:
-        for cid, reason in violations:
-            neo.record_violation(action_id, cid, reason)
-
-        explain = neo.explain_violations(user_id, action_id)
-
-        # Deduplicate alternatives
-        uniq_alts = []
-        seen = set()
-        for a in alternatives:
-            if a not in seen:
-                uniq_alts.append(a)
-                seen.add(a)
-
-        return Decision(
-            ok=False,
-            action_id=action_id,
-            action_type=action_type,
-            message="Blocked: request violates one or more persistent constraints.",
-            violations=explain,
-            alternatives=uniq_alts[:5],
-        )
+        # --- Check C: budget cap ---
+        if action_type == SPEND_MONEY and by_type.get(BUDGET_CAP):
+            amt = _parse_amount(user_request)
+            if amt is not None:
+                for c in by_type[BUDGET_CAP]:
+                    cap = float(c["params"].get("max_amount", 0))
+                    if cap > 0 and amt > cap:
+                        violations.append((c["id"], f"Requested spend ${amt:.2f} exceeds budget cap ${cap:.2f}"))
+                        alternatives.extend(_alternatives_for_budget(cap))
+
+        # If violations found, materialize in graph and return explainability
+        if violations:
+            await neo.record_violations(action_id, violations, session=session)
+
+            explain = await neo.explain_violations(user_id, action_id, session=session)
+
+            # Deduplicate alternatives (order-preserving, runs in C)
+            uniq_alts = list(dict.fromkeys(alternatives))
+
+            return Decision(
+                ok=False,
+                action_id=action_id,
+                action_type=action_type,
+                message="Blocked: request violates one or more persistent constraints.",
+                violations=explain,
+                alternatives=uniq_alts[:5],
+            )
 
     # Otherwise approve
     return Decision(
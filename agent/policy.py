@@ -3,9 +3,59 @@ from __future__ import annotations
 
 import re
 from dataclasses import dataclass
-from typing import Any, Dict, Optional, Tuple
+from typing import Any, Callable, Dict, Optional, Set, Tuple
 from uuid import uuid4
 
+try:
+    import ahocorasick  # C-level multi-keyword matching
+except ImportError:  # pragma: no cover - optional dependency
+    ahocorasick = None
+
+
+def compile_keyword_scanner(categories: Dict[str, Tuple[str, ...]]) -> Callable[[str], Set[str]]:
+    """
+    Compiles keyword lists (category -> keywords) into a scanner that returns
+    the set of categories whose keywords occur in a text. One pass over the
+    text replaces a chain of `any(w in t for w in [...])` substring loops.
+
+    Uses an Aho-Corasick automaton when pyahocorasick is installed; otherwise
+    falls back to a single combined regex with an overlapping lookahead so
+    substring semantics match the original `in` checks.
+    """
+    cats_by_word: Dict[str, Set[str]] = {}
+    for cat, words in categories.items():
+        for w in words:
+            cats_by_word.setdefault(w, set()).add(cat)
+
+    if ahocorasick is not None:
+        automaton = ahocorasick.Automaton()
+        for w, cats in cats_by_word.items():
+            automaton.add_word(w, cats)
+        automaton.make_automaton()
+
+        def scan(text: str) -> Set[str]:
+            found: Set[str] = set()
+            for _, cats in automaton.iter(text):
+                found |= cats
+            return found
+
+        return scan
+
+    # Longest-first so prefix-related keywords (data/dataset) resolve to the
+    # longer match; the lookahead keeps overlapping occurrences visible.
+    alternation = "|".join(
+        re.escape(w) for w in sorted(cats_by_word, key=len, reverse=True)
+    )
+    pattern = re.compile(f"(?=({alternation}))")
+
+    def scan(text: str) -> Set[str]:
+        found: Set[str] = set()
+        for m in pattern.finditer(text):
+            found |= cats_by_word[m.group(1)]
+        return found
+
+    return scan
+
 
 # Constraint types (keep these stable across your app)
 NO_MEETINGS_AFTER_HOUR = "NO_MEETINGS_AFTER_HOUR"
@@ -15,6 +65,28 @@ NO_SHARING_WITH_EXTERNALS = "NO_SHARING_WITH_EXTERNALS"
 HARD = "HARD"
 SOFT = "SOFT"
 
+# Compiled once at import; these run on every /constraints call.
+_WS_RE = re.compile(r"\s+")
+# One alternation covers both "after 9pm" and "after 21:00" so the text is
+# scanned once; the matched group tells us which branch fired. An am/pm
+# match anywhere wins over an earlier bare-hour match, matching the
+# original two-pass order.
+_AFTER_TIME_RE = re.compile(
+    r"\bafter\s+(?:(?P<h1>\d{1,2})\s*(?P<ampm>a\.?m\.?|p\.?m\.?)|(?P<h2>\d{1,2})(?::\d{2})?)\b"
+)
+_AMOUNT_RE = re.compile(r"\$\s*([0-9][0-9,]*(?:\.[0-9]+)?)")
+_CAP_MAX_RE = re.compile(r"\b(?:cap|max(?:imum)?)\s*[:=]?\s*([0-9][0-9,]*(?:\.[0-9]+)?)\b")
+
+# Single-pass keyword scan for constraint recognition.
+_CONSTRAINT_SCAN = compile_keyword_scanner(
+    {
+        "share": ("share", "send", "export", "give", "forward"),
+        "data": ("dataset", "data", "file", "files"),
+        "external": ("contractor", "external", "third party", "3rd party", "vendor"),
+        "deny": ("never", "do not", "don't", "no "),
+    }
+)
+
 
 @dataclass
 class ParsedConstraint:
@@ -26,7 +98,7 @@ class ParsedConstraint:
 
 
 def _normalize(s: str) -> str:
-    return re.sub(r"\s+", " ", (s or "").strip().lower())
+    return _WS_RE.sub(" ", (s or "").strip().lower())
 
 
 def _parse_time_to_hour(text: str) -> Optional[int]:
@@ -39,26 +111,27 @@ def _parse_time_to_hour(text: str) -> Optional[int]:
     """
     t = _normalize(text)
 
-    # Matches: after 9pm / after 9 pm / after 9 p.m.
-    m = re.search(r"\bafter\s+(\d{1,2})\s*(a\.?m\.?|p\.?m\.?)\b", t)
-    if m:
-        h = int(m.group(1))
-        ampm = m.group(2).replace(".", "")
-        if ampm == "pm" and h != 12:
-            h += 12
-        if ampm == "am" and h == 12:
-            h = 0
-        if 0 <= h <= 23:
-            return h
-
-    # Matches: after 21:00 or after 21
-    m2 = re.search(r"\bafter\s+(\d{1,2})(?::\d{2})?\b", t)
-    if m2:
-        h = int(m2.group(1))
-        if 0 <= h <= 23:
-            return h
-
-    return None
+    h24: Optional[int] = None
+    for m in _AFTER_TIME_RE.finditer(t):
+        if m.group("ampm"):
+            # after 9pm / after 9 pm / after 9 p.m. — preferred over any
+            # bare-hour match
+            h = int(m.group("h1"))
+            ampm = m.group("ampm").replace(".", "")
+            if ampm == "pm" and h != 12:
+                h += 12
+            if ampm == "am" and h == 12:
+                h = 0
+            if 0 <= h <= 23:
+                return h
+        elif h24 is None:
+            # after 21:00 or after 21 — kept as fallback in case an am/pm
+            # time follows
+            h = int(m.group("h2"))
+            if 0 <= h <= 23:
+                h24 = h
+
+    return h24
 
 
 def _parse_money_amount(text: str) -> Optional[float]:
@@ -69,12 +142,12 @@ def _parse_money_amount(text: str) -> Optional[float]:
     t = _normalize(text)
 
     # Prefer $ patterns
-    m = re.search(r"\$\s*([0-9][0-9,]*(?:\.[0-9]+)?)", t)
+    m = _AMOUNT_RE.search(t)
     if m:
         return float(m.group(1).replace(",", ""))
 
     # Fallback: 'budget cap 1000' or 'max 1200'
-    m2 = re.search(r"\b(?:cap|max(?:imum)?)\s*[:=]?\s*([0-9][0-9,]*(?:\.[0-9]+)?)\b", t)
+    m2 = _CAP_MAX_RE.search(t)
     if m2:
         return float(m2.group(1).replace(",", ""))
 
@@ -123,10 +196,11 @@ def parse_constraint(user_text: str) -> Tuple[Optional[ParsedConstraint], Option
 
     # 3) Do not share datasets with external contractors
     # Trigger: share/send + dataset/file/data + external/contractor
-    share_words = any(w in t for w in ["share", "send", "export", "give", "forward"])
-    data_words = any(w in t for w in ["dataset", "data", "file", "files"])
-    ext_words = any(w in t for w in ["contractor", "external", "third party", "3rd party", "vendor"])
-    deny_words = any(w in t for w in ["never", "do not", "don't", "no "])
+    cats = _CONSTRAINT_SCAN(t)
+    share_words = "share" in cats
+    data_words = "data" in cats
+    ext_words = "external" in cats
+    deny_words = "deny" in cats
 
     if share_words and data_words and ext_words:
         banned_party = "contractor" if "contractor" in t else "external"
@@ -44,18 +44,19 @@ class RequestIn(BaseModel):
 
 
 @app.on_event("startup")
-def _startup() -> None:
+async def _startup() -> None:
     try:
-        neo.ensure_schema()
-        neo.upsert_user(USER_ID)
+        await neo.ensure_schema()
+        await neo.upsert_user(USER_ID)
     except Exception as e:
         # Don’t hide errors; make them obvious early
         raise RuntimeError(f"Neo4j startup failed: {e}") from e
 
 
 @app.on_event("shutdown")
-def _shutdown() -> None:
-    neo.close()
+async def _shutdown() -> None:
+    await neo.close()
+    await mem.close()
 
 
 @app.get("/health")
@@ -70,13 +71,13 @@ def health() -> Dict[str, Any]:
 
 
 @app.post("/constraints")
-def add_constraint(payload: ConstraintIn) -> Dict[str, Any]:
+async def add_constraint(payload: ConstraintIn) -> Dict[str, Any]:
     parsed, err = parse_constraint(payload.text)
     if err:
         raise HTTPException(status_code=400, detail=err)
 
     # 1) Store in MemMachine (source of truth)
-    mem.store_constraint(
+    await mem.store_constraint(
         user_id=USER_ID,
         constraint_dict={
             "id": parsed.id,
@@ -88,7 +89,7 @@ def add_constraint(payload: ConstraintIn) -> Dict[str, Any]:
     )
 
     # 2) Mirror into Neo4j for graph reasoning/explainability
-    neo.upsert_constraint(
+    await neo.upsert_constraint(
         user_id=USER_ID,
         constraint=ConstraintPayload(
             id=parsed.id,
@@ -112,11 +113,11 @@ def add_constraint(payload: ConstraintIn) -> Dict[str, Any]:
 
 
 @app.post("/request")
-def process_request(payload: RequestIn) -> Dict[str, Any]:
+async def process_request(payload: RequestIn) -> Dict[str, Any]:
     # Retrieve constraints from MemMachine
-    constraints: List[Dict[str, Any]] = mem.list_constraints(user_id=USER_ID)
+    constraints: List[Dict[str, Any]] = await mem.list_constraints(user_id=USER_ID)
 
-    decision = evaluate_request(
+    decision = await evaluate_request(
         user_id=USER_ID,
         user_request=payload.text,
         constraints=constraints,